@@ -5,7 +5,6 @@ Simple command-line interface for the API documentation fetcher
 """
 
 import sys
-import subprocess
 from pathlib import Path
 
 def main():
@@ -19,7 +18,9 @@ def main():
         sys.exit(1)
 
     command = sys.argv[1]
-    scripts_dir = Path(__file__).parent / "scripts"
+
+    # The scripts import each other as top-level modules, run them in-process
+    sys.path.insert(0, str(Path(__file__).parent / "scripts"))
 
     if command == "extract":
         if len(sys.argv) < 3:
@@ -27,29 +28,21 @@ def main():
             print("Usage: python doc-fetcher.py extract <url> [options]")
             sys.exit(1)
 
-        script = scripts_dir / "extract_all_links.py"
-        # Translate --playwright to --use-playwright for the underlying script
-        script_args = [arg if arg != "--playwright" else "--use-playwright" for arg in sys.argv[2:]]
-        args = ["python", str(script)] + script_args
+        from extract_all_links import main as run
 
     elif command == "fetch":
-        script = scripts_dir / "fetch_all_extracted_links.py"
-        # Translate --playwright to --use-playwright for the underlying script
-        script_args = [arg if arg != "--playwright" else "--use-playwright" for arg in sys.argv[2:]]
-        args = ["python", str(script)] + script_args
+        from fetch_all_extracted_links import main as run
 
     else:
         print(f"Error: Unknown command '{command}'")
         print("Valid commands: extract, fetch")
         sys.exit(1)
 
-    # Run the command with unbuffered output
+    # Translate --playwright to --use-playwright for the underlying script
+    script_args = [arg if arg != "--playwright" else "--use-playwright" for arg in sys.argv[2:]]
+
     try:
-        # Add -u flag for unbuffered output
-        args[1:1] = ['-u']
-        subprocess.run(args, check=True)
-    except subprocess.CalledProcessError as e:
-        sys.exit(e.returncode)
+        run(script_args)
     except KeyboardInterrupt:
         print("\n\nInterrupted by user")
         sys.exit(130)
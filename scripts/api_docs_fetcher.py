@@ -5,26 +5,191 @@ A flexible tool for extracting and organizing API documentation from various sou
 Supports both static and JavaScript-rendered sites
 """
 
+import asyncio
+import aiohttp
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry, make_headers
+from bs4 import BeautifulSoup, CData, NavigableString
+import soupsieve as sv
+import hashlib
 import json
 import re
 import os
+import random
+import tempfile
+import threading
+from email.utils import parsedate_to_datetime
 from urllib.parse import urljoin, urlparse
 import time
-from typing import Dict, List, Set, Optional
+from typing import Dict, Iterator, List, Set, Optional, Tuple
 import yaml
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from itertools import chain
 from pathlib import Path
 
 # Playwright imports - optional, will fallback to requests if not available
 try:
-    from playwright.sync_api import sync_playwright
+    from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
     PLAYWRIGHT_AVAILABLE = True
 except ImportError:
     PLAYWRIGHT_AVAILABLE = False
 
+# Crawl limits: default pages saved per base URL and pages fetched at once
+MAX_PAGES_PER_SITE = 20
+CRAWL_WORKERS = 8
+# Random extra spacing between requests to the same host
+DELAY_JITTER_SECONDS = 0.2
+# How often to retry a 429 or transient server error, backing off BACKOFF_FACTOR * 2 ** attempt seconds
+RETRY_STATUSES = (500, 502, 503, 504)
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.3
+# Larger responses are treated as downloads rather than pages
+MAX_PAGE_BYTES = 5 * 1024 * 1024
+
+# How much of each kind of content a page is converted with; the walk stops collecting past these
+MAX_SECTION_ITEMS = 3
+MAX_ENDPOINTS = 10
+MAX_CODE_EXAMPLES = 5
+
+# Tags the single-pass page walk dispatches on
+_HEADING_TAGS = frozenset(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+_SECTION_CONTENT_TAGS = frozenset(['p', 'div', 'pre', 'table', 'ul', 'ol'])
+_TEXT_STRING_TYPES = (NavigableString, CData)
+# Classes marking navigation blocks (.navigation, .nav, .sidebar, .toc, .menu)
+_NAV_CLASSES = frozenset(['navigation', 'nav', 'sidebar', 'toc', 'menu'])
+
+# Code language hints: class names mentioning a language, then content patterns in order
+_LANG_CLASS_RE = re.compile(r'python|javascript|bash|curl|json|xml', re.IGNORECASE)
+_LANG_CONTENT_RES = [
+    (re.compile(r'^(?:curl|wget)', re.MULTILINE), 'bash'),
+    (re.compile(r'^(?:import|def|class)', re.MULTILINE), 'python'),
+    (re.compile(r'^[{\[]'), 'json'),
+    (re.compile(r'<[^>]+>'), 'xml'),
+]
+
+# Title sources, in order of preference: the first of these tags, then the selectors
+_TITLE_TAGS = ('h1', 'title')
+_TITLE_SELECTORS = [sv.compile(selector) for selector in [
+    '.page-title',
+    '.doc-title',
+    '.api-title',
+    '[role="heading"][aria-level="1"]'
+]]
+
+# Common content selectors (in order of preference)
+_CONTENT_SELECTORS = [sv.compile(selector) for selector in [
+    'main',
+    '[role="main"]',
+    '.main-content',
+    '.content',
+    '.documentation',
+    '.api-docs',
+    '.doc-content',
+    'article',
+    '.markdown-body',  # GitHub style
+    '.rst-content',    # Read the Docs style
+    'body'  # Fallback
+]]
+
+def _declared_charset(content_type: str) -> Optional[str]:
+    """Return the charset named in a Content-Type header, if any"""
+    
+    charset = content_type.partition('charset=')[2].split(';')[0].strip(' "\'')
+    return charset or None
+
+def _resolve_href(origin: str, base_url: str, href: str) -> str:
+    """urljoin(base_url, href), skipping the parse for the common root-relative and absolute links"""
+    
+    # Dot segments, control characters, ';' params and empty queries/fragments get normalised by urljoin
+    if ('/.' not in href and ';' not in href and '?#' not in href
+            and href.isprintable() and not href.endswith(('?', '#'))):
+        if href.startswith('/') and not href.startswith('//'):
+            return origin + href
+        # Only with a host: urljoin falls back to base_url for 'https://' and 'http:///path'
+        scheme, sep, rest = href.partition('://')
+        if sep and scheme in ('http', 'https') and rest[:1] not in ('', '/', '?', '#'):
+            return href
+    return urljoin(base_url, href)
+
+# ASCII-only filename cleanup: drop what isn't a word character, space or '-', then turn spaces into '-'
+_ASCII = [chr(i) for i in range(128)]
+_FILENAME_DROP = str.maketrans({c: None for c in _ASCII if not (c.isalnum() or c.isspace() or c in '-_')})
+_FILENAME_SPACES = str.maketrans({c: '-' for c in _ASCII if c.isspace()})
+
+def _safe_filename(title: str) -> str:
+    """Reduce a page title to word characters separated by single '-'"""
+    
+    if not title.isascii():
+        safe_title = re.sub(r'[^\w\s-]', '', title).strip()
+        return re.sub(r'[-\s]+', '-', safe_title)
+    
+    safe_title = title.translate(_FILENAME_DROP).strip().translate(_FILENAME_SPACES)
+    while '--' in safe_title:
+        safe_title = safe_title.replace('--', '-')
+    return safe_title
+
+def _is_html(content_type: str) -> bool:
+    """Check whether a Content-Type header describes an HTML page"""
+    
+    return content_type.strip().lower().startswith(('text/html', 'application/xhtml+xml'))
+
+async def _read_capped(stream: aiohttp.StreamReader, limit: int) -> Optional[bytes]:
+    """Read a whole response body, or return None as soon as it grows past limit bytes"""
+    
+    try:
+        await stream.readexactly(limit + 1)
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+    return None
+
+def _retry_after(value: Optional[str], default: float) -> float:
+    """Parse a Retry-After header (seconds or HTTP date) into seconds to wait"""
+    
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+def _cache_meta(headers) -> Dict[str, str]:
+    """Pick the response headers the cache needs for parsing and conditional requests"""
+    
+    return {
+        'content_type': headers.get('Content-Type', ''),
+        'etag': headers.get('ETag'),
+        'last_modified': headers.get('Last-Modified')
+    }
+
+def _conditional_headers(meta: Dict) -> Dict[str, str]:
+    """Build If-None-Match / If-Modified-Since headers from cached metadata"""
+    
+    headers = {}
+    if meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'):
+        headers['If-Modified-Since'] = meta['last_modified']
+    return headers
+
+def _atomic_write(path: Path, data: bytes):
+    """Write a file via a temporary sibling so readers never see a partial file"""
+    
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
 @dataclass
 class FetcherConfig:
     """Configuration for the documentation fetcher"""
@@ -40,6 +205,9 @@ class FetcherConfig:
     extract_api_endpoints: bool = True
     create_index: bool = True
     use_playwright: bool = False
+    max_pages: int = MAX_PAGES_PER_SITE
+    cache_dir: Optional[str] = None
+    cache_ttl_seconds: float = 24 * 60 * 60
 
 class APIDocsFetcher:
     """API documentation fetcher that works with various documentation sites"""
@@ -56,10 +224,39 @@ class APIDocsFetcher:
         if config.custom_headers:
             default_headers.update(config.custom_headers)
         
+        # Offers br only when urllib3 can decode it. The aiohttp sessions don't get this,
+        # since they advertise their own decoders and urllib3's may list ones aiohttp lacks.
+        self.session.headers.update(make_headers(accept_encoding=True))
         self.session.headers.update(default_headers)
+        self.headers = default_headers
+        
+        # Keep connections to doc hosts alive and retry transient server errors
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32,
+                              max_retries=Retry(total=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR,
+                                                status_forcelist=[429, *RETRY_STATUSES],
+                                                raise_on_status=False))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['Connection'] = 'keep-alive'
+        
+        # Time of the latest request scheduled against each host, for per-host politeness
+        self._last_hit: Dict[str, float] = {}
+        self._last_hit_lock = threading.Lock()
+        
+        # Playwright objects are bound to the thread that started them, so one worker thread owns the browser.
+        # Created up front because fetch_page runs on several threads at once during the async crawl.
+        self._pw = None
+        self._browser = None
+        self._playwright_executor: Optional[ThreadPoolExecutor] = None
+        if config.use_playwright and PLAYWRIGHT_AVAILABLE:
+            self._playwright_executor = ThreadPoolExecutor(max_workers=1)
+        
+        self._base_domains = frozenset(urlparse(base_url).netloc for base_url in config.base_urls)
         
         self.visited_urls: Set[str] = set()
         self.failed_urls: List[str] = []
+        # Why each failed fetch failed, for callers that report it
+        self.fetch_errors: Dict[str, str] = {}
         self.successful_pages: List[Dict] = []
         
         # Common API documentation patterns
@@ -70,6 +267,12 @@ class APIDocsFetcher:
             r'(\{[^}]*\}[^\s]*)',  # Template variables
         ]
         
+        # Compile patterns once instead of on every page and candidate URL
+        self._endpoint_res = [re.compile(p, re.IGNORECASE | re.MULTILINE) for p in self.endpoint_patterns]
+        # URL filters are joined into one alternation each, so patterns must not use named groups or backreferences
+        self._include_union = self._compile_union(config.include_patterns)
+        self._exclude_union = self._compile_union(config.exclude_patterns)
+        
         # Common documentation section patterns
         self.section_patterns = [
             'authentication',
@@ -84,6 +287,14 @@ class APIDocsFetcher:
             'quick.?start'
         ]
 
+    @staticmethod
+    def _compile_union(patterns: Optional[List[str]]) -> Optional[re.Pattern]:
+        """Compile a list of patterns into a single case-insensitive alternation"""
+        
+        if not patterns:
+            return None
+        return re.compile('|'.join(f'(?:{p})' for p in patterns), re.IGNORECASE)
+
     def should_fetch_url(self, url: str) -> bool:
         """Determine if a URL should be fetched based on patterns"""
         
@@ -92,19 +303,16 @@ class APIDocsFetcher:
         
         # Check if external links are allowed
         if not self.config.follow_external_links:
-            base_domains = [urlparse(base_url).netloc for base_url in self.config.base_urls]
-            if urlparse(url).netloc not in base_domains:
+            if urlparse(url).netloc not in self._base_domains:
                 return False
         
         # Check include patterns
-        if self.config.include_patterns:
-            if not any(re.search(pattern, url, re.IGNORECASE) for pattern in self.config.include_patterns):
-                return False
+        if self._include_union and not self._include_union.search(url):
+            return False
         
         # Check exclude patterns
-        if self.config.exclude_patterns:
-            if any(re.search(pattern, url, re.IGNORECASE) for pattern in self.config.exclude_patterns):
-                return False
+        if self._exclude_union and self._exclude_union.search(url):
+            return False
         
         return True
 
@@ -115,57 +323,263 @@ class APIDocsFetcher:
             return None
 
         try:
+            # Serve fresh cached pages without touching the network or sleeping
+            rendered = self._playwright_executor is not None
+            cached, fresh, meta = self._cache_lookup(url, rendered)
+            if fresh:
+                print(f"Cached: {url}")
+                self.visited_urls.add(url)
+                return BeautifulSoup(cached, 'lxml', from_encoding=_declared_charset(meta.get('content_type', '')))
+
+            # Rate limiting, per host so crawls of different sites don't slow each other down
+            time.sleep(self._reserve_slot(url))
+
             print(f"Fetching: {url}")
 
-            # Use Playwright if enabled
-            if self.config.use_playwright and PLAYWRIGHT_AVAILABLE:
+            # Use Playwright if enabled (and the fetcher hasn't been closed)
+            if rendered:
                 try:
-                    with sync_playwright() as p:
-                        browser = p.chromium.launch(headless=True)
-                        page = browser.new_page()
-                        # Use 'load' instead of 'networkidle' for faster loading
-                        page.goto(url, wait_until='load', timeout=60000)
-                        # Wait for dynamic content to load
-                        page.wait_for_timeout(3000)
-                        html_content = page.content()
-                        browser.close()
-
-                        self.visited_urls.add(url)
-                        time.sleep(self.config.delay_seconds)
-                        return BeautifulSoup(html_content, 'html.parser')
+                    html_content = self._playwright_executor.submit(self._render_page, url).result()
+
+                    self.visited_urls.add(url)
+                    if html_content is None:
+                        print(f"Skipping non-HTML content: {url}")
+                        return None
+                    self._cache_store(url, html_content.encode('utf-8'), {'content_type': 'text/html; charset=utf-8'},
+                                      rendered=True)
+                    return BeautifulSoup(html_content, 'lxml')
                 except Exception as e:
                     print(f"Playwright error for {url}: {e}, falling back to requests")
+                    # Revalidate against the raw page's cache entry, not the rendered one
+                    cached, _, meta = self._cache_lookup(url)
 
             # Use requests (default or fallback)
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
+            # Stream so the body is only downloaded once the headers say it's a reasonably sized page
+            with self.session.get(url, timeout=30, stream=True, headers=_conditional_headers(meta)) as response:
+                if response.status_code == 304 and cached is not None:
+                    # Unchanged since it was cached
+                    self._cache_touch(url)
+                    body, content_type = cached, meta.get('content_type', '')
+                else:
+                    if response.status_code == 429:
+                        # Still rate limited after the adapter's retries, keep away from this host for a while
+                        self._defer_host(url, _retry_after(response.headers.get('Retry-After'), self.config.delay_seconds))
+                    response.raise_for_status()
+                    content_type = response.headers.get('Content-Type', '')
+                    body = None
+                    if _is_html(content_type) and int(response.headers.get('Content-Length') or 0) <= MAX_PAGE_BYTES:
+                        body = response.raw.read(MAX_PAGE_BYTES + 1, decode_content=True)
+                    if body is not None and len(body) <= MAX_PAGE_BYTES:
+                        self._cache_store(url, body, _cache_meta(response.headers))
+                    else:
+                        body = None
             self.visited_urls.add(url)
 
-            # Rate limiting
-            time.sleep(self.config.delay_seconds)
+            if body is None:
+                print(f"Skipping non-HTML or oversized content: {url} ({content_type or 'unknown type'})")
+                return None
 
-            return BeautifulSoup(response.content, 'html.parser')
+            # Trust the declared charset; without one requests guesses ISO-8859-1, so let lxml sniff instead
+            return BeautifulSoup(body, 'lxml', from_encoding=_declared_charset(content_type))
 
         except Exception as e:
             print(f"Failed to fetch {url}: {e}")
             self.failed_urls.append(url)
+            self.fetch_errors[url] = str(e) or type(e).__name__
             return None
 
-    def extract_title(self, soup: BeautifulSoup) -> str:
-        """Extract page title using various strategies"""
+    def _cache_path(self, url: str, rendered: bool = False) -> Optional[Path]:
+        """Return where the cached body for a URL lives, or None when caching is off
+
+        Playwright-rendered and raw bodies of the same URL are cached separately.
+        """
         
-        # Try different title sources in order of preference
-        title_selectors = [
-            'h1',
-            'title', 
-            '.page-title',
-            '.doc-title',
-            '.api-title',
-            '[role="heading"][aria-level="1"]'
-        ]
+        if not self.config.cache_dir:
+            return None
+        key = hashlib.sha1(f"{url}|{'pw' if rendered else 'req'}".encode()).hexdigest()
+        return Path(self.config.cache_dir) / key[:2] / f"{key}.html"
+
+    def _cache_lookup(self, url: str, rendered: bool = False) -> Tuple[Optional[bytes], bool, Dict]:
+        """Return the cached body for a URL, whether it is still fresh, and its metadata"""
+        
+        path = self._cache_path(url, rendered)
+        if path is None:
+            return None, False, {}
         
-        for selector in title_selectors:
-            element = soup.select_one(selector)
+        try:
+            age = time.time() - path.stat().st_mtime
+            body = path.read_bytes()
+        except OSError:
+            return None, False, {}
+        
+        try:
+            meta = json.loads(path.with_suffix('.meta.json').read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            meta = {}
+        
+        return body, age < self.config.cache_ttl_seconds, meta
+
+    def _cache_store(self, url: str, body: bytes, meta: Dict, rendered: bool = False):
+        """Write a fetched body and its validators to the cache"""
+        
+        path = self._cache_path(url, rendered)
+        if path is None:
+            return
+        
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _atomic_write(path.with_suffix('.meta.json'), json.dumps(meta).encode('utf-8'))
+            _atomic_write(path, body)
+        except OSError as e:
+            print(f"Failed to cache {url}: {e}")
+
+    def _cache_touch(self, url: str):
+        """Mark a cached body as fresh again after the server confirmed it is unchanged"""
+        
+        try:
+            os.utime(self._cache_path(url))
+        except OSError:
+            pass
+
+    def _render_page(self, url: str) -> str:
+        """Render a page in the shared headless browser, starting it on first use"""
+        
+        if self._browser is None:
+            self._pw = sync_playwright().start()
+            self._browser = self._pw.chromium.launch(headless=True)
+        
+        page = self._browser.new_page()
+        try:
+            response = page.goto(url, wait_until='domcontentloaded', timeout=60000)
+            if response is not None and not _is_html(response.header_value('content-type') or ''):
+                return None
+            # Give client-side rendering a moment to populate links, but don't wait on slow resources
+            try:
+                page.wait_for_selector('a[href]', state='attached', timeout=5000)
+            except PlaywrightTimeoutError:
+                pass
+            return page.content()
+        finally:
+            page.close()
+
+    def _stop_browser(self):
+        """Shut down the shared browser and Playwright driver"""
+        
+        if self._browser is not None:
+            self._browser.close()
+            self._browser = None
+        if self._pw is not None:
+            self._pw.stop()
+            self._pw = None
+
+    def close(self):
+        """Release the browser and connections held by the fetcher"""
+        
+        if self._playwright_executor is not None:
+            self._playwright_executor.submit(self._stop_browser).result()
+            self._playwright_executor.shutdown()
+            self._playwright_executor = None
+        self.session.close()
+
+    def _reserve_slot(self, url: str) -> float:
+        """Claim the next request slot for the URL's host and return how long to wait for it"""
+        
+        delay = self.config.delay_seconds
+        if delay:
+            delay += random.uniform(0, DELAY_JITTER_SECONDS)
+        
+        host = urlparse(url).netloc
+        with self._last_hit_lock:
+            now = time.monotonic()
+            slot = max(now, self._last_hit.get(host, 0.0) + delay)
+            self._last_hit[host] = slot
+        return slot - now
+
+    def _defer_host(self, url: str, seconds: float):
+        """Hold off further requests to the URL's host for the given number of seconds"""
+        
+        host = urlparse(url).netloc
+        with self._last_hit_lock:
+            self._last_hit[host] = max(self._last_hit.get(host, 0.0), time.monotonic() + seconds)
+
+    async def fetch_page_async(self, session: aiohttp.ClientSession, url: str) -> Optional[BeautifulSoup]:
+        """Fetch and parse a single page without blocking the event loop"""
+        
+        if not self.should_fetch_url(url):
+            return None
+        
+        # Playwright's sync API runs its own browser, keep it off the event loop
+        if self.config.use_playwright and PLAYWRIGHT_AVAILABLE:
+            return await asyncio.to_thread(self.fetch_page, url)
+        
+        try:
+            # Serve fresh cached pages without touching the network or waiting for a slot
+            cached, fresh, meta = self._cache_lookup(url)
+            if fresh:
+                print(f"Cached: {url}")
+                self.visited_urls.add(url)
+                return BeautifulSoup(cached, 'lxml', from_encoding=_declared_charset(meta.get('content_type', '')))
+            
+            timeout = aiohttp.ClientTimeout(sock_connect=30, sock_read=30)
+            for attempt in range(MAX_RETRIES + 1):
+                # Rate limiting, per host so crawls of different sites don't slow each other down
+                await asyncio.sleep(self._reserve_slot(url))
+                
+                print(f"Fetching: {url}")
+                async with session.get(url, timeout=timeout, headers=_conditional_headers(meta)) as response:
+                    if response.status == 429:
+                        # Keep away from this host for as long as it asks, then try again.
+                        # Without Retry-After back off exponentially, even when there is no delay between requests.
+                        backoff = max(self.config.delay_seconds, BACKOFF_FACTOR) * 2 ** attempt
+                        self._defer_host(url, _retry_after(response.headers.get('Retry-After'), backoff))
+                        if attempt < MAX_RETRIES:
+                            continue
+                    
+                    if response.status in RETRY_STATUSES and attempt < MAX_RETRIES:
+                        # Transient server error, back off as the requests session's Retry does
+                        response.release()
+                        await asyncio.sleep(BACKOFF_FACTOR * 2 ** attempt)
+                        continue
+                    
+                    if response.status == 304 and cached is not None:
+                        # Unchanged since it was cached
+                        self._cache_touch(url)
+                        body, encoding = cached, _declared_charset(meta.get('content_type', ''))
+                    else:
+                        response.raise_for_status()
+                        content_type = response.headers.get('Content-Type', '')
+                        body, encoding = None, response.charset
+                        # Only download bodies of reasonably sized pages
+                        if _is_html(content_type) and (response.content_length or 0) <= MAX_PAGE_BYTES:
+                            body = await _read_capped(response.content, MAX_PAGE_BYTES)
+                        if body is not None:
+                            await asyncio.to_thread(self._cache_store, url, body, _cache_meta(response.headers))
+                break
+            
+            self.visited_urls.add(url)
+            if body is None:
+                print(f"Skipping non-HTML or oversized content: {url} ({content_type or 'unknown type'})")
+                return None
+            return BeautifulSoup(body, 'lxml', from_encoding=encoding)
+        
+        except Exception as e:
+            print(f"Failed to fetch {url}: {e}")
+            self.failed_urls.append(url)
+            self.fetch_errors[url] = str(e) or type(e).__name__
+            return None
+
+    def extract_title(self, soup: BeautifulSoup, title_elements: List = None) -> str:
+        """Extract page title using various strategies
+
+        title_elements are the first h1 and title tags, when the caller already found them while walking the page.
+        """
+        
+        if title_elements is None:
+            title_elements = [soup.find(name) for name in _TITLE_TAGS]
+        
+        # Try different title sources in order of preference
+        candidates = chain(title_elements, (selector.select_one(soup) for selector in _TITLE_SELECTORS))
+        for element in candidates:
             if element:
                 title = element.get_text().strip()
                 if title and len(title) < 200:  # Reasonable title length
@@ -176,187 +590,232 @@ class APIDocsFetcher:
     def extract_main_content(self, soup: BeautifulSoup) -> BeautifulSoup:
         """Extract the main content area from the page"""
         
-        # Common content selectors (in order of preference)
-        content_selectors = [
-            'main',
-            '[role="main"]',
-            '.main-content',
-            '.content',
-            '.documentation',
-            '.api-docs',
-            '.doc-content',
-            'article',
-            '.markdown-body',  # GitHub style
-            '.rst-content',    # Read the Docs style
-            'body'  # Fallback
-        ]
-        
-        for selector in content_selectors:
-            content = soup.select_one(selector)
+        for selector in _CONTENT_SELECTORS:
+            content = selector.select_one(soup)
             if content:
                 return content
         
         return soup
 
-    def extract_sections(self, content: BeautifulSoup) -> List[Dict]:
-        """Extract structured sections from content"""
+    def _extract_all(self, soup: BeautifulSoup, content: Optional[BeautifulSoup], base_url: str = None) -> Dict:
+        """Collect sections, endpoints, code examples and navigation links in one walk over the page"""
         
         sections = []
         current_section = None
+        table_endpoints = []
+        code_examples = []
+        text_parts = []
+        links = {}  # insertion-ordered, dedupes links in document order
+        title_elements = {}
+        
+        want_endpoints = self.config.extract_api_endpoints
+        want_code = self.config.extract_code_examples
+        
+        if base_url is not None:
+            parsed_base = urlparse(base_url)
+            origin = f"{parsed_base.scheme}://{parsed_base.netloc}"
         
-        # Find all headings and content
-        for element in content.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'div', 'pre', 'table', 'ul', 'ol']):
+        # The content area and navigation blocks are contiguous runs of the walk, tracked by their last descendant
+        inside = content is soup
+        content_end = None
+        nav_end = None
+        
+        for element in soup.descendants:
+            # Checked for every tag, the content element included (strings have no name)
+            name = element.name
+            if name in _TITLE_TAGS and name not in title_elements:
+                title_elements[name] = element
+            
+            is_content = element is content
+            if is_content:
+                inside = True
+                content_end = content._last_descendant()
             
-            if element.name and element.name.startswith('h'):
-                # New section
-                if current_section and current_section.get('content'):
-                    sections.append(current_section)
+            if isinstance(element, NavigableString):
+                # Same strings get_text() would join for the endpoint patterns
+                if inside and want_endpoints and type(element) in _TEXT_STRING_TYPES:
+                    text_parts.append(element)
+            
+            else:
+                if base_url is not None:
+                    if nav_end is None and self._is_navigation(element):
+                        nav_end = element._last_descendant()
+                    elif name == 'a' and nav_end is not None:
+                        href = element.get('href')
+                        if href:
+                            links.setdefault(_resolve_href(origin, base_url, href), None)
                 
-                current_section = {
-                    'level': int(element.name[1]),
-                    'title': element.get_text().strip(),
-                    'content': []
-                }
+                # The content element can also be a navigation block, but it isn't part of its own sections
+                if inside and not is_content:
+                    if name in _HEADING_TAGS:
+                        # New section
+                        if current_section and current_section.get('content'):
+                            sections.append(current_section)
+                        
+                        current_section = {
+                            'level': int(name[1]),
+                            'title': element.get_text().strip(),
+                            'content': []
+                        }
+                    
+                    elif (name in _SECTION_CONTENT_TAGS and current_section is not None
+                          and len(current_section['content']) < MAX_SECTION_ITEMS):
+                        # Add content to current section
+                        text = element.get_text().strip()
+                        if text and len(text) > 10:  # Skip very short snippets
+                            current_section['content'].append(text)
+                    
+                    if want_code and name in ('pre', 'code') and len(code_examples) < MAX_CODE_EXAMPLES:
+                        example = self._code_example(element)
+                        if example:
+                            code_examples.append(example)
+                    
+                    # Extract from tables (common in API docs); only the first table row survives deduplication
+                    if want_endpoints and not table_endpoints and name == 'table':
+                        table_endpoints = self._table_endpoints(element)
             
-            elif current_section is not None:
-                # Add content to current section
-                text = element.get_text().strip()
-                if text and len(text) > 10:  # Skip very short snippets
-                    current_section['content'].append(text)
+            if element is nav_end:
+                nav_end = None
+            if element is content_end:
+                inside = False
         
         # Don't forget the last section
         if current_section and current_section.get('content'):
             sections.append(current_section)
         
-        return sections
+        endpoints = self._match_endpoints(''.join(text_parts), table_endpoints) if want_endpoints else []
+        
+        return {
+            'sections': sections,
+            'api_endpoints': endpoints,
+            'code_examples': code_examples,
+            'navigation_links': [link for link in links if self.should_fetch_url(link)],
+            'title_elements': [title_elements.get(name) for name in _TITLE_TAGS]
+        }
 
-    def extract_api_endpoints(self, content: BeautifulSoup) -> List[Dict]:
-        """Extract API endpoints from the content"""
+    @staticmethod
+    def _is_navigation(element) -> bool:
+        """Check whether a tag is a navigation block (nav, sidebar, toc, menu...)"""
         
-        if not self.config.extract_api_endpoints:
-            return []
+        if element.name == 'nav' or element.get('role') == 'navigation':
+            return True
+        return not _NAV_CLASSES.isdisjoint(element.get('class', ()))
+
+    def _match_endpoints(self, text_content: str, table_endpoints: List[Dict]) -> List[Dict]:
+        """Extract API endpoints from text using the endpoint patterns, followed by the table endpoints
+
+        Duplicates are dropped as they're found, keyed on (method, path), and matching stops at MAX_ENDPOINTS.
+        """
         
         endpoints = []
-        text_content = content.get_text()
-        
-        # Extract using patterns
-        for pattern in self.endpoint_patterns:
-            matches = re.findall(pattern, text_content, re.IGNORECASE | re.MULTILINE)
-            for match in matches:
-                if isinstance(match, tuple):
-                    if len(match) >= 2:
-                        endpoints.append({
-                            'method': match[0].upper() if match[0].upper() in ['GET', 'POST', 'PUT', 'DELETE', 'PATCH'] else 'GET',
-                            'path': match[1],
-                            'type': 'endpoint'
-                        })
-                    else:
-                        endpoints.append({
-                            'method': 'GET',
-                            'path': match[0],
-                            'type': 'endpoint'
-                        })
+        seen = set()
+        
+        # Every endpoint pattern needs a '{' or a '/' next to a verb or /api/, so most prose pages can skip the regexes.
+        # casefold() so this stays exact under re.IGNORECASE (e.g. 'ſ' matches 's'); '/ap' because 'ı' matches 'i'.
+        patterns = self._endpoint_res
+        if '{' not in text_content:
+            folded = text_content.casefold() if '/' in text_content else ''
+            if not any(token in folded for token in ('/ap', 'get', 'post', 'put', 'delete', 'patch')):
+                patterns = []
+        
+        for pattern in patterns:
+            for match in pattern.finditer(text_content):
+                groups = match.groups()
+                if len(groups) >= 2:
+                    method = groups[0].upper()
+                    if method not in ('GET', 'POST', 'PUT', 'DELETE', 'PATCH'):
+                        method = 'GET'
+                    path = groups[1]
                 else:
+                    method, path = 'GET', groups[0]
+                
+                key = (method, path)
+                if key in seen:
+                    continue
+                seen.add(key)
+                endpoints.append({
+                    'method': method,
+                    'path': path,
+                    'type': 'endpoint'
+                })
+                if len(endpoints) >= MAX_ENDPOINTS:
+                    return endpoints
+        
+        # Table rows have no method or path, so they all share the ('GET', '') key
+        if table_endpoints and ('GET', '') not in seen:
+            endpoints.append(table_endpoints[0])
+        
+        return endpoints
+
+    @staticmethod
+    def _table_endpoints(table) -> List[Dict]:
+        """Extract endpoint rows from a table whose headers look like an endpoint listing"""
+        
+        headers = [th.get_text().strip().lower() for th in table.find_all('th')]
+        
+        endpoints = []
+        if any(keyword in ' '.join(headers) for keyword in ['endpoint', 'method', 'path', 'url']):
+            for row in table.find_all('tr')[1:]:  # Skip header
+                cells = [td.get_text().strip() for td in row.find_all(['td', 'th'])]
+                if len(cells) >= 2:
                     endpoints.append({
-                        'method': 'GET',
-                        'path': match,
-                        'type': 'endpoint'
+                        'type': 'table_endpoint',
+                        'data': cells
                     })
         
-        # Extract from tables (common in API docs)
-        for table in content.find_all('table'):
-            headers = [th.get_text().strip().lower() for th in table.find_all('th')]
-            
-            if any(keyword in ' '.join(headers) for keyword in ['endpoint', 'method', 'path', 'url']):
-                for row in table.find_all('tr')[1:]:  # Skip header
-                    cells = [td.get_text().strip() for td in row.find_all(['td', 'th'])]
-                    if len(cells) >= 2:
-                        endpoints.append({
-                            'type': 'table_endpoint',
-                            'data': cells
-                        })
-        
-        # Remove duplicates
-        unique_endpoints = []
-        seen = set()
-        for endpoint in endpoints:
-            key = f"{endpoint.get('method', 'GET')}:{endpoint.get('path', '')}"
-            if key not in seen:
-                seen.add(key)
-                unique_endpoints.append(endpoint)
-        
-        return unique_endpoints
+        return endpoints
 
-    def extract_code_examples(self, content: BeautifulSoup) -> List[Dict]:
-        """Extract code examples from the content"""
+    @staticmethod
+    def _code_example(code_block) -> Optional[Dict]:
+        """Build a code example entry for a pre/code block, or None if it's too short"""
         
-        if not self.config.extract_code_examples:
-            return []
+        code_text = code_block.get_text().strip()
         
-        examples = []
+        if len(code_text) < 20:  # Skip very short snippets
+            return None
         
-        # Find code blocks
-        for code_block in content.find_all(['pre', 'code']):
-            code_text = code_block.get_text().strip()
-            
-            if len(code_text) < 20:  # Skip very short snippets
-                continue
-            
-            # Determine language
-            language = 'text'
-            
-            # Check class attributes for language hints
-            class_attr = code_block.get('class', [])
-            for cls in class_attr:
-                if any(lang in cls.lower() for lang in ['python', 'javascript', 'bash', 'curl', 'json', 'xml']):
-                    language = cls.lower()
+        # Determine language
+        language = 'text'
+        
+        # Check class attributes for language hints
+        class_attr = code_block.get('class', [])
+        for cls in class_attr:
+            if _LANG_CLASS_RE.search(cls):
+                language = cls.lower()
+                break
+        
+        # Language detection from content patterns (code_text is already stripped)
+        if language == 'text':
+            for pattern, lang in _LANG_CONTENT_RES:
+                if pattern.search(code_text):
+                    language = lang
                     break
-            
-            # Language detection from content patterns
-            if language == 'text':
-                if re.search(r'^(curl|wget)', code_text.strip(), re.MULTILINE):
-                    language = 'bash'
-                elif re.search(r'^(import|def|class)', code_text.strip(), re.MULTILINE):
-                    language = 'python'
-                elif re.search(r'^(\{|\[)', code_text.strip()):
-                    language = 'json'
-                elif re.search(r'<[^>]+>', code_text):
-                    language = 'xml'
-            
-            examples.append({
-                'language': language,
-                'code': code_text,
-                'length': len(code_text)
-            })
         
-        return examples
+        return {
+            'language': language,
+            'code': code_text,
+            'length': len(code_text)
+        }
 
-    def find_navigation_links(self, soup: BeautifulSoup, base_url: str) -> List[str]:
-        """Find relevant navigation links"""
+    def extract_sections(self, content: BeautifulSoup) -> List[Dict]:
+        """Extract structured sections from content"""
         
-        links = []
-        
-        # Common navigation selectors
-        nav_selectors = [
-            'nav a',
-            '.navigation a',
-            '.nav a', 
-            '.sidebar a',
-            '.toc a',
-            '.menu a',
-            'ul.nav a',
-            '[role="navigation"] a'
-        ]
+        return self._extract_all(content, content)['sections']
+
+    def extract_api_endpoints(self, content: BeautifulSoup) -> List[Dict]:
+        """Extract API endpoints from the content"""
         
-        for selector in nav_selectors:
-            for link in soup.select(selector):
-                href = link.get('href')
-                if href:
-                    full_url = urljoin(base_url, href)
-                    if self.should_fetch_url(full_url):
-                        links.append(full_url)
+        return self._extract_all(content, content)['api_endpoints']
+
+    def extract_code_examples(self, content: BeautifulSoup) -> List[Dict]:
+        """Extract code examples from the content"""
+        
+        return self._extract_all(content, content)['code_examples']
+
+    def find_navigation_links(self, soup: BeautifulSoup, base_url: str) -> List[str]:
+        """Find relevant navigation links"""
         
-        return list(set(links))  # Remove duplicates
+        return self._extract_all(soup, None, base_url)['navigation_links']
 
     def extract_page_content(self, soup: BeautifulSoup, url: str) -> Dict:
         """Extract all relevant content from a page"""
@@ -364,16 +823,14 @@ class APIDocsFetcher:
         if not soup:
             return {}
         
-        title = self.extract_title(soup)
         main_content = self.extract_main_content(soup)
+        extracted = self._extract_all(soup, main_content, url)
+        title = self.extract_title(soup, extracted.pop('title_elements'))
         
         content = {
             'url': url,
             'title': title,
-            'sections': self.extract_sections(main_content),
-            'api_endpoints': self.extract_api_endpoints(main_content),
-            'code_examples': self.extract_code_examples(main_content),
-            'navigation_links': self.find_navigation_links(soup, url)
+            **extracted
         }
         
         return content
@@ -381,65 +838,54 @@ class APIDocsFetcher:
     def convert_to_markdown(self, content: Dict, api_name: str = None) -> str:
         """Convert extracted content to markdown"""
         
-        md_lines = []
+        return '\n'.join(self._iter_markdown(content, api_name))
+
+    def _iter_markdown(self, content: Dict, api_name: str = None) -> Iterator[str]:
+        """Yield the markdown for extracted content line by line"""
         
         # Title
         title = content.get('title', 'API Documentation')
         if api_name:
             title = f"{api_name} - {title}"
         
-        md_lines.extend([
-            f"# {title}",
-            "",
-            f"**Source:** {content['url']}",
-            ""
-        ])
+        yield f"# {title}"
+        yield ""
+        yield f"**Source:** {content['url']}"
+        yield ""
         
         # Sections
         for section in content.get('sections', []):
             heading_level = min(section['level'] + 1, 6)  # Cap at h6
             heading_marker = '#' * heading_level
             
-            md_lines.extend([
-                f"{heading_marker} {section['title']}",
-                ""
-            ])
+            yield f"{heading_marker} {section['title']}"
+            yield ""
             
-            for content_item in section['content'][:3]:  # Limit content per section
-                md_lines.extend([
-                    content_item,
-                    ""
-                ])
+            for content_item in section['content'][:MAX_SECTION_ITEMS]:  # Limit content per section
+                yield content_item
+                yield ""
         
         # API Endpoints
         if content.get('api_endpoints'):
-            md_lines.extend([
-                "## API Endpoints",
-                ""
-            ])
+            yield "## API Endpoints"
+            yield ""
             
-            for endpoint in content['api_endpoints'][:10]:  # Limit endpoints
+            for endpoint in content['api_endpoints'][:MAX_ENDPOINTS]:  # Limit endpoints
                 if endpoint.get('type') == 'table_endpoint':
-                    md_lines.extend([
-                        f"- **Table Data:** {' | '.join(endpoint.get('data', []))}",
-                    ])
+                    yield f"- **Table Data:** {' | '.join(endpoint.get('data', []))}"
                 else:
                     method = endpoint.get('method', 'GET')
                     path = endpoint.get('path', '')
-                    md_lines.extend([
-                        f"- **{method}** `{path}`",
-                    ])
+                    yield f"- **{method}** `{path}`"
             
-            md_lines.append("")
+            yield ""
         
         # Code Examples
         if content.get('code_examples'):
-            md_lines.extend([
-                "## Code Examples",
-                ""
-            ])
+            yield "## Code Examples"
+            yield ""
             
-            for i, example in enumerate(content['code_examples'][:5]):  # Limit examples
+            for i, example in enumerate(content['code_examples'][:MAX_CODE_EXAMPLES]):  # Limit examples
                 lang = example.get('language', 'text')
                 code = example['code']
                 
@@ -447,16 +893,30 @@ class APIDocsFetcher:
                 if len(code) > 1000:
                     code = code[:1000] + "\n... (truncated)"
                 
-                md_lines.extend([
-                    f"### Example {i+1} ({lang})",
-                    "",
-                    f"```{lang}",
-                    code,
-                    "```",
-                    ""
-                ])
+                yield f"### Example {i+1} ({lang})"
+                yield ""
+                yield f"```{lang}"
+                yield code
+                yield "```"
+                yield ""
+
+    def save_page(self, page_content: Dict, output_path: Path, api_name: str, index: int) -> Path:
+        """Write extracted page content to a markdown file and return its path"""
+        
+        # Create filename
+        title = page_content.get('title', 'untitled')
+        safe_title = _safe_filename(title)
+        filename = f"{api_name}_{index:02d}_{safe_title}.md"
+        
+        # Convert to markdown, streaming lines straight to the file
+        lines = self._iter_markdown(page_content, api_name)
+        
+        file_path = output_path / filename
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(next(lines))
+            f.writelines('\n' + line for line in lines)
         
-        return '\n'.join(md_lines)
+        return file_path
 
     def crawl_documentation(self) -> Dict[str, str]:
         """Crawl all documentation and return file mapping"""
@@ -465,61 +925,10 @@ class APIDocsFetcher:
         output_path = Path(self.config.output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
         
-        created_files = {}
-        
-        # Process each base URL
-        for base_url in self.config.base_urls:
-            print(f"\n=== Processing: {base_url} ===")
-            
-            # Extract API name from URL for file naming
-            parsed_url = urlparse(base_url)
-            api_name = parsed_url.netloc.replace('www.', '').replace('.', '_')
-            
-            # Crawl this URL and its linked pages
-            pages_to_process = [base_url]
-            processed_count = 0
-            
-            while pages_to_process and processed_count < 20:  # Limit total pages
-                url = pages_to_process.pop(0)
-                
-                if url in self.visited_urls:
-                    continue
-                
-                soup = self.fetch_page(url)
-                if not soup:
-                    continue
-                
-                # Extract content
-                page_content = self.extract_page_content(soup, url)
-                if not page_content:
-                    continue
-                
-                self.successful_pages.append(page_content)
-                
-                # Create filename
-                title = page_content.get('title', 'untitled')
-                safe_title = re.sub(r'[^\w\s-]', '', title).strip()
-                safe_title = re.sub(r'[-\s]+', '-', safe_title)
-                filename = f"{api_name}_{processed_count:02d}_{safe_title}.md"
-                
-                # Convert to markdown
-                markdown_content = self.convert_to_markdown(page_content, api_name)
-                
-                # Save file
-                file_path = output_path / filename
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(markdown_content)
-                
-                created_files[filename] = str(file_path)
-                print(f"  Created: {filename}")
-                
-                # Add linked pages for further crawling (if depth allows)
-                if processed_count < self.config.max_depth:
-                    for link in page_content.get('navigation_links', [])[:5]:  # Limit links per page
-                        if link not in pages_to_process and link not in self.visited_urls:
-                            pages_to_process.append(link)
-                
-                processed_count += 1
+        try:
+            created_files = asyncio.run(self._crawl_async(output_path))
+        finally:
+            self.close()
         
         # Create index file
         if self.config.create_index:
@@ -527,6 +936,89 @@ class APIDocsFetcher:
         
         return created_files
 
+    async def _crawl_async(self, output_path: Path) -> Dict[str, str]:
+        """Crawl every base URL concurrently over one shared aiohttp session"""
+        
+        created_files = {}
+        
+        connector = aiohttp.TCPConnector(limit=32, limit_per_host=5)
+        async with aiohttp.ClientSession(headers=self.headers, connector=connector) as session:
+            await asyncio.gather(*(self._crawl_site(session, base_url, output_path, created_files)
+                                   for base_url in self.config.base_urls))
+        
+        return created_files
+
+    async def _crawl_site(self, session: aiohttp.ClientSession, base_url: str,
+                          output_path: Path, created_files: Dict[str, str]):
+        """Crawl one base URL and its linked pages with a pool of workers"""
+        
+        print(f"\n=== Processing: {base_url} ===")
+        
+        # Extract API name from URL for file naming
+        api_name = get_api_name(base_url)
+        
+        # Crawl this URL and its linked pages
+        pages_to_process: asyncio.Queue = asyncio.Queue()
+        pages_to_process.put_nowait(base_url)
+        queued = {base_url}
+        processed_count = 0
+        
+        # Saves are serialised so a page only takes an index once its file is written
+        save_lock = asyncio.Lock()
+        
+        async def worker():
+            nonlocal processed_count
+            
+            while True:
+                url = await pages_to_process.get()
+                try:
+                    if processed_count >= self.config.max_pages or url in self.visited_urls:
+                        continue
+                    
+                    soup = await self.fetch_page_async(session, url)
+                    if not soup:
+                        continue
+                    
+                    # Extract content
+                    page_content = self.extract_page_content(soup, url)
+                    if not page_content:
+                        continue
+                    
+                    async with save_lock:
+                        if processed_count >= self.config.max_pages:
+                            continue
+                        index = processed_count
+                        
+                        # Save file
+                        # Write in a thread so disk I/O overlaps with the other workers' fetches
+                        file_path = await asyncio.to_thread(self.save_page, page_content, output_path, api_name, index)
+                        processed_count += 1
+                    
+                    self.successful_pages.append(page_content)
+                    created_files[file_path.name] = str(file_path)
+                    print(f"  Created: {file_path.name}")
+                    
+                    # Add linked pages for further crawling (if depth allows)
+                    if index < self.config.max_depth:
+                        for link in page_content.get('navigation_links', [])[:5]:  # Limit links per page
+                            if link not in queued and link not in self.visited_urls:
+                                queued.add(link)
+                                pages_to_process.put_nowait(link)
+                
+                except Exception as e:
+                    # One bad page shouldn't take down the worker and stall the queue
+                    print(f"Failed to process {url}: {e}")
+                    self.failed_urls.append(url)
+                finally:
+                    pages_to_process.task_done()
+        
+        workers = [asyncio.create_task(worker()) for _ in range(CRAWL_WORKERS)]
+        await pages_to_process.join()
+        
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
     def create_index_file(self, output_path: Path, created_files: Dict[str, str]):
         """Create an index file"""
         
@@ -576,6 +1068,11 @@ class APIDocsFetcher:
         
         print(f"Created index: {index_path}")
 
+def get_api_name(url: str) -> str:
+    """Derive the API name used for file naming from a URL"""
+    
+    return urlparse(url).netloc.replace('www.', '').replace('.', '_')
+
 def load_config_from_file(config_file: str) -> FetcherConfig:
     """Load configuration from YAML or JSON file"""
     
@@ -594,6 +1091,7 @@ def main():
     parser.add_argument('urls', nargs='+', help='Base URLs to fetch documentation from')
     parser.add_argument('-o', '--output', default='api_docs', help='Output directory')
     parser.add_argument('-d', '--depth', type=int, default=2, help='Maximum crawl depth')
+    parser.add_argument('--max-pages', type=int, default=MAX_PAGES_PER_SITE, help='Maximum pages to save per base URL')
     parser.add_argument('--delay', type=float, default=0.5, help='Delay between requests (seconds)')
     parser.add_argument('--config', help='Configuration file (YAML or JSON)')
     parser.add_argument('--include', nargs='*', help='URL patterns to include')
@@ -602,6 +1100,7 @@ def main():
     parser.add_argument('--no-endpoints', action='store_true', help='Skip API endpoints extraction')
     parser.add_argument('--use-playwright', action='store_true',
                        help='Use Playwright for JavaScript-rendered sites (slower but more complete)')
+    parser.add_argument('--cache-dir', help='Cache fetched pages here and revalidate them on later runs')
 
     args = parser.parse_args()
     
@@ -614,12 +1113,14 @@ def main():
             base_urls=args.urls,
             output_dir=args.output,
             max_depth=args.depth,
+            max_pages=args.max_pages,
             delay_seconds=args.delay,
             include_patterns=args.include,
             exclude_patterns=args.exclude,
             extract_code_examples=not args.no_examples,
             extract_api_endpoints=not args.no_endpoints,
-            use_playwright=args.use_playwright
+            use_playwright=args.use_playwright,
+            cache_dir=args.cache_dir
         )
     
     print("API Documentation Fetcher")
@@ -4,25 +4,124 @@ Documentation Structure Discovery Tool
 Discovers all documentation sections from a site before fetching
 """
 
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import aiohttp
+from selectolax.lexbor import LexborHTMLParser
 from urllib.parse import urljoin, urlparse
+from functools import lru_cache
 import json
 import time
-from typing import Set, List, Dict
+from typing import Set, List, Dict, Optional
 import re
+import sys
+
+@lru_cache(maxsize=10000)
+def _parse(u):
+    """urlparse, memoized since the same URLs are seen on many pages"""
+    return urlparse(u)
+
+# Transient server errors are retried with exponential backoff
+RETRY_STATUSES = (500, 502, 503, 504)
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.3
+
+# Links to PDFs, archives, images or huge pages are not worth downloading
+MAX_PAGE_BYTES = 5_000_000
+
+# Navigation elements (common patterns)
+NAV_SELECTORS = [
+    'nav',
+    '.navigation',
+    '.sidebar',
+    '.toc',
+    '.menu',
+    '[class*="nav"]',
+    '[class*="sidebar"]',
+    '[class*="menu"]',
+    '.left-nav',
+    '.docs-nav'
+]
+CONTENT_SELECTORS = ['main', '.content', '.main-content', 'article']
+
+# One selector list per page walk, matching links inside any of the containers
+_NAV_LINK_SELECTOR = ', '.join(f'{selector} a[href]' for selector in NAV_SELECTORS)
+_CONTENT_LINK_SELECTOR = ', '.join(f'{selector} a[href]' for selector in CONTENT_SELECTORS)
+
+# Content-area links whose text or URL mention any of these look like documentation
+_DOC_LINK_RE = re.compile(r'api|guide|tutorial|reference|getting started|authentication|account|user|service')
+
+# Section keywords mapped to the fetch group they put a section in, highest priority group first
+SECTION_GROUPS = {
+    'account': 'account_management', 'user': 'account_management',
+    'tenant': 'account_management', 'service': 'account_management',
+    'auth': 'authentication', 'login': 'authentication', 'token': 'authentication',
+    'api': 'api_library', 'library': 'api_library', 'reference': 'api_library',
+    'tutorial': 'tutorials', 'guide': 'tutorials', 'getting started': 'tutorials',
+    'error': 'errors_and_status', 'status': 'errors_and_status', 'response': 'errors_and_status',
+}
+_GROUP_PRIORITY = {group: i for i, group in enumerate(dict.fromkeys(SECTION_GROUPS.values()))}
+
+# Lookahead so a single scan reports every keyword, even overlapping ones
+_SECTION_GROUP_RE = re.compile('(?=(' + '|'.join(map(re.escape, SECTION_GROUPS)) + '))')
 
 class DocStructureDiscoverer:
     def __init__(self, base_url: str):
         self.base_url = base_url
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.base_domain = _parse(base_url).netloc
+        self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        }
+        self.timeout = aiohttp.ClientTimeout(total=10)
         self.visited = set()
         self.doc_structure = {}
 
-    def discover_structure(self, url: str, depth: int = 0, max_depth: int = 3) -> Dict:
+    def to_path(self, link_url: str) -> str:
+        """Shorten a link to its part after base_url; links on another scheme are kept whole"""
+        return link_url[len(self.base_url):] if link_url.startswith(self.base_url) else link_url
+
+    def to_url(self, path: str) -> str:
+        """Rebuild the full link URL from a stored path"""
+        return path if path.startswith(('http://', 'https://')) else self.base_url + path
+
+    def export_sections(self, sections: Dict) -> Dict:
+        """Expand sections into title/url/path dicts for display and JSON output"""
+
+        exported = {}
+        for section, links in sections.items():
+            exported[section] = []
+            for title, path in zip(links['titles'], links['paths']):
+                link_url = self.to_url(path)
+                exported[section].append({
+                    'title': title,
+                    'url': link_url,
+                    'path': _parse(link_url).path
+                })
+
+        return exported
+
+    async def fetch_html(self, session: aiohttp.ClientSession, url: str) -> Optional[str]:
+        """GET a page, retrying connection failures and transient server errors
+
+        Returns None without reading the body if the response isn't reasonably sized HTML.
+        """
+
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                async with session.get(url, timeout=self.timeout) as response:
+                    if response.status not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                        response.raise_for_status()
+                        if 'html' not in response.content_type or (response.content_length or 0) > MAX_PAGE_BYTES:
+                            print(f"Skipping non-HTML or oversized content at {url}: {response.content_type}")
+                            return None
+                        return await response.text()
+            except aiohttp.ClientConnectionError:
+                if attempt == MAX_RETRIES:
+                    raise
+
+            await asyncio.sleep(BACKOFF_FACTOR * 2 ** attempt)
+
+    async def discover_structure(self, session: aiohttp.ClientSession, url: str,
+                                 depth: int = 0, max_depth: int = 3) -> Dict:
         """Discover documentation structure by analyzing navigation and links"""
 
         if url in self.visited or depth > max_depth:
@@ -31,81 +130,62 @@ class DocStructureDiscoverer:
         self.visited.add(url)
 
         try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
+            html = await self.fetch_html(session, url)
+            if html is None:
+                return {}
+
+            tree = LexborHTMLParser(html)
+            title = tree.css_first('title')
 
             structure = {
                 'url': url,
-                'title': soup.find('title').text if soup.find('title') else 'No Title',
+                'title': title.text() if title else 'No Title',
                 'sections': {}
             }
 
-            # Look for navigation elements (common patterns)
-            nav_selectors = [
-                'nav',
-                '.navigation',
-                '.sidebar',
-                '.toc',
-                '.menu',
-                '[class*="nav"]',
-                '[class*="sidebar"]',
-                '[class*="menu"]',
-                '.left-nav',
-                '.docs-nav'
-            ]
-
             links_found = set()
 
-            for selector in nav_selectors:
-                nav_elements = soup.select(selector)
-                for nav in nav_elements:
-                    # Find all links in navigation
-                    for link in nav.find_all('a', href=True):
-                        href = link['href']
-                        if not href.startswith(('http://', 'https://', 'mailto:', '#', 'javascript:')):
-                            href = urljoin(url, href)
+            # Find all links in navigation elements
+            for link in tree.css(_NAV_LINK_SELECTOR):
+                href = link.attributes['href'] or ''
+                if not href.startswith(('http://', 'https://', 'mailto:', '#', 'javascript:')):
+                    href = urljoin(url, href)
 
-                        # Only include links from same domain
-                        if urlparse(href).netloc == urlparse(self.base_url).netloc:
-                            links_found.add((href, link.get_text(strip=True)))
+                # Only include links from same domain
+                if _parse(href).netloc == self.base_domain:
+                    links_found.add((href, link.text(strip=True)))
 
             # Also look for main content area links that look like documentation
-            content_areas = soup.select('main, .content, .main-content, article')
-            for area in content_areas:
-                for link in area.find_all('a', href=True):
-                    text = link.get_text(strip=True)
-                    href = link['href']
-
-                    # Check if this looks like a documentation link
-                    if any(keyword in text.lower() or keyword in href.lower()
-                           for keyword in ['api', 'guide', 'tutorial', 'reference', 'getting started',
-                                         'authentication', 'account', 'user', 'service']):
-                        if not href.startswith(('http://', 'https://', 'mailto:', '#', 'javascript:')):
-                            href = urljoin(url, href)
-
-                        if urlparse(href).netloc == urlparse(self.base_url).netloc:
-                            links_found.add((href, text))
+            for link in tree.css(_CONTENT_LINK_SELECTOR):
+                text = link.text(strip=True)
+                href = link.attributes['href'] or ''
+
+                # Check if this looks like a documentation link
+                if _DOC_LINK_RE.search(text.lower()) or _DOC_LINK_RE.search(href.lower()):
+                    if not href.startswith(('http://', 'https://', 'mailto:', '#', 'javascript:')):
+                        href = urljoin(url, href)
+
+                    if _parse(href).netloc == self.base_domain:
+                        links_found.add((href, text))
 
             # Organize links by path structure
             for link_url, link_text in links_found:
                 if link_url != url and link_text:  # Avoid self-references
                     # Extract section from URL path
-                    path = urlparse(link_url).path
+                    path = _parse(link_url).path
                     parts = [p for p in path.split('/') if p]
 
                     if len(parts) > 0:
                         section_key = parts[-2] if len(parts) > 1 else parts[-1]
-                        section_key = section_key.replace('.html', '').replace('-', ' ').title()
+                        # Section keys repeat across many links and pages
+                        section_key = sys.intern(section_key.replace('.html', '').replace('-', ' ').title())
 
                         if section_key not in structure['sections']:
-                            structure['sections'][section_key] = []
+                            structure['sections'][section_key] = {'titles': [], 'paths': []}
 
-                        structure['sections'][section_key].append({
-                            'title': link_text,
-                            'url': link_url,
-                            'path': path
-                        })
+                        section = structure['sections'][section_key]
+                        section['titles'].append(link_text)
+                        section['paths'].append(self.to_path(link_url))
 
             return structure
 
@@ -113,25 +193,32 @@ class DocStructureDiscoverer:
             print(f"Error discovering {url}: {e}")
             return {}
 
-    def discover_all_sections(self, start_urls: List[str]) -> Dict:
+    async def discover_all_sections(self, start_urls: List[str]) -> Dict:
         """Discover all documentation sections from multiple starting points"""
 
         all_sections = {}
 
         for url in start_urls:
             print(f"\nDiscovering structure from: {url}")
-            structure = self.discover_structure(url)
 
+        # Starting points are independent, fetch them all at once over one session
+        connector = aiohttp.TCPConnector(limit=20)
+        async with aiohttp.ClientSession(headers=self.headers, connector=connector) as session:
+            structures = await asyncio.gather(*(self.discover_structure(session, url) for url in start_urls))
+
+        for structure in structures:
             # Merge with existing sections
             for section, links in structure.get('sections', {}).items():
                 if section not in all_sections:
-                    all_sections[section] = []
+                    all_sections[section] = {'titles': [], 'paths': []}
 
                 # Add unique links
-                existing_urls = {link['url'] for link in all_sections[section]}
-                for link in links:
-                    if link['url'] not in existing_urls:
-                        all_sections[section].append(link)
+                merged = all_sections[section]
+                existing_paths = set(merged['paths'])
+                for title, path in zip(links['titles'], links['paths']):
+                    if path not in existing_paths:
+                        merged['titles'].append(title)
+                        merged['paths'].append(path)
 
         return all_sections
 
@@ -145,29 +232,20 @@ class DocStructureDiscoverer:
 
         for section, links in sections.items():
             # Group related sections
-            if any(keyword in section.lower() for keyword in ['account', 'user', 'tenant', 'service']):
-                group = 'account_management'
-            elif any(keyword in section.lower() for keyword in ['auth', 'login', 'token']):
-                group = 'authentication'
-            elif any(keyword in section.lower() for keyword in ['api', 'library', 'reference']):
-                group = 'api_library'
-            elif any(keyword in section.lower() for keyword in ['tutorial', 'guide', 'getting started']):
-                group = 'tutorials'
-            elif any(keyword in section.lower() for keyword in ['error', 'status', 'response']):
-                group = 'errors_and_status'
-            else:
-                group = 'other'
+            keywords = _SECTION_GROUP_RE.findall(section.lower())
+            group = min((SECTION_GROUPS[keyword] for keyword in keywords),
+                        key=_GROUP_PRIORITY.get, default='other')
 
             if group not in major_sections:
                 major_sections[group] = []
 
-            major_sections[group].extend(links)
+            major_sections[group].extend(links['paths'])
 
         # Generate commands for each major section
-        for group, links in major_sections.items():
-            if links:
+        for group, paths in major_sections.items():
+            if paths:
                 # Get unique base URLs for this group
-                urls = list(set(link['url'] for link in links[:5]))  # Limit to top 5 URLs per group
+                urls = list(set(self.to_url(path) for path in paths[:5]))  # Limit to top 5 URLs per group
 
                 cmd = f"python api_docs_fetcher.py {' '.join(urls)} --output {output_base}/{group} --depth 5 --delay 1.0"
                 commands.append({
@@ -192,12 +270,13 @@ def main():
     print("=" * 60)
 
     discoverer = DocStructureDiscoverer("https://developer.acronis.com")
-    sections = discoverer.discover_all_sections(start_urls)
+    sections = asyncio.run(discoverer.discover_all_sections(start_urls))
+    exported = discoverer.export_sections(sections)
 
     print(f"\nFound {len(sections)} documentation sections:")
     print("-" * 60)
 
-    for section, links in sorted(sections.items()):
+    for section, links in sorted(exported.items()):
         print(f"\n{section}:")
         for link in links[:3]:  # Show first 3 links per section
             print(f"  - {link['title']}")
@@ -207,7 +286,7 @@ def main():
 
     # Save structure to JSON
     with open('acronis_docs_structure.json', 'w', encoding='utf-8') as f:
-        json.dump(sections, f, indent=2)
+        json.dump(exported, f, indent=2)
     print(f"\nSaved documentation structure to acronis_docs_structure.json")
 
     # Generate fetch commands
@@ -217,28 +296,32 @@ def main():
     print("FETCH COMMANDS BY SECTION:")
     print("=" * 60)
 
+    command_lines = []
+    for cmd_info in commands:
+        print(f"\n# {cmd_info['group'].upper().replace('_', ' ')}")
+        print(cmd_info['command'])
+        command_lines.append(f"# {cmd_info['group'].upper().replace('_', ' ')}\n{cmd_info['command']}\n\n")
+
     with open('fetch_commands.txt', 'w', encoding='utf-8') as f:
-        for cmd_info in commands:
-            print(f"\n# {cmd_info['group'].upper().replace('_', ' ')}")
-            print(cmd_info['command'])
-            f.write(f"# {cmd_info['group'].upper().replace('_', ' ')}\n")
-            f.write(cmd_info['command'] + '\n\n')
+        f.write(''.join(command_lines))
 
     print("\nFetch commands saved to fetch_commands.txt")
 
     # Create a batch script
-    with open('fetch_all_docs.bat', 'w', encoding='utf-8') as f:
-        f.write('@echo off\n')
-        f.write('echo Fetching Acronis Documentation in Sections\n')
-        f.write('echo ==========================================\n\n')
+    batch_lines = [
+        '@echo off\n',
+        'echo Fetching Acronis Documentation in Sections\n',
+        'echo ==========================================\n\n'
+    ]
 
-        for cmd_info in commands:
-            f.write(f'echo Fetching {cmd_info["group"]}...\n')
-            f.write(cmd_info['command'] + '\n')
-            f.write('echo.\n\n')
+    for cmd_info in commands:
+        batch_lines.append(f'echo Fetching {cmd_info["group"]}...\n{cmd_info["command"]}\necho.\n\n')
 
-        f.write('echo All documentation fetched!\n')
-        f.write('pause\n')
+    batch_lines.append('echo All documentation fetched!\n')
+    batch_lines.append('pause\n')
+
+    with open('fetch_all_docs.bat', 'w', encoding='utf-8') as f:
+        f.write(''.join(batch_lines))
 
     print("Batch script saved to fetch_all_docs.bat")
 
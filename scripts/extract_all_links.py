@@ -6,57 +6,137 @@ Supports both static and JavaScript-rendered sites
 """
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from selectolax.lexbor import LexborHTMLParser
 from urllib.parse import urljoin, urlparse
+from functools import lru_cache
 import argparse
+import hashlib
+import re
 import time
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 
 # Playwright imports - optional, will fallback to requests if not available
 try:
-    from playwright.sync_api import sync_playwright
+    from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
     PLAYWRIGHT_AVAILABLE = True
 except ImportError:
     PLAYWRIGHT_AVAILABLE = False
     print("Note: Playwright not available. Install with 'pip install playwright' for JS-rendered sites.")
 
-def fetch_page_content(url, use_playwright=False):
-    """Fetch page content using either requests or Playwright"""
+# URLs containing any of these look like documentation and are worth crawling
+_DOC_RE = re.compile(r'doc|api|guide|tutorial')
 
-    if use_playwright and PLAYWRIGHT_AVAILABLE:
+# Fetched pages are cached here so re-runs don't hit the site again
+CACHE_DIR = Path(".cache")
+DEFAULT_CACHE_TTL = 24 * 60 * 60  # seconds
+
+# Links to PDFs, archives, images or huge pages are not worth downloading
+MAX_PAGE_BYTES = 5_000_000
+
+# Shared session so requests to the same host reuse pooled keep-alive connections
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+})
+_SESSION.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=20))
+_SESSION.mount('http://', HTTPAdapter(pool_connections=10, pool_maxsize=20))
+
+@lru_cache(maxsize=10000)
+def _parse(u):
+    """urlparse, memoized since the same URLs are seen on many pages"""
+    return urlparse(u)
+
+def _clean_url(url):
+    """Drop the fragment and query string, which don't change the page fetched"""
+    return url.partition('#')[0].partition('?')[0]
+
+def fetch_page_content(url, playwright_ctx=None):
+    """Fetch page content using either requests or a shared Playwright browser context
+
+    Returns an empty string for responses that aren't reasonably sized HTML.
+    """
+
+    if playwright_ctx is not None:
         try:
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                page = browser.new_page()
-                # Use 'load' instead of 'networkidle' for faster loading
-                page.goto(url, wait_until='load', timeout=60000)
-                # Wait for dynamic content to load
-                page.wait_for_timeout(3000)
-                content = page.content()
-                browser.close()
-                return content
+            page = playwright_ctx.new_page()
+            try:
+                page.goto(url, wait_until='domcontentloaded', timeout=60000)
+                # Links are all we read, so wait for them to be rendered rather than for the network
+                try:
+                    page.wait_for_selector('a[href]', state='attached', timeout=5000)
+                except PlaywrightTimeoutError:
+                    pass
+                return page.content()
+            finally:
+                page.close()
         except Exception as e:
             print(f"  Playwright error: {e}, falling back to requests")
-            use_playwright = False
-
-    if not use_playwright:
-        session = requests.Session()
-        session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
-        response = session.get(url, timeout=10)
+
+    # Stream so the body is only downloaded once the headers say it's a page
+    with _SESSION.get(url, timeout=10, stream=True) as response:
         response.raise_for_status()
+
+        content_type = response.headers.get('Content-Type', '').lower()
+        content_length = int(response.headers.get('Content-Length') or 0)
+        if 'html' not in content_type or content_length > MAX_PAGE_BYTES:
+            print(f"  Skipping non-HTML or oversized content: {content_type or 'unknown type'}")
+            return ''
+
         return response.text
 
-def extract_all_links(base_url, max_pages=50, use_playwright=False):
+def fetch_page_cached(url, playwright_ctx=None, cache_ttl=DEFAULT_CACHE_TTL):
+    """Fetch page content through the disk cache, returning (content, from_cache)"""
+
+    if not cache_ttl:
+        return fetch_page_content(url, playwright_ctx), False
+
+    # Rendered and raw HTML of the same page differ, so each fetch mode gets its own entry
+    mode = 'pw' if playwright_ctx is not None else 'req'
+    cache_file = CACHE_DIR / f"{hashlib.sha1(f'{url}|{mode}'.encode()).hexdigest()}.html"
+    try:
+        if time.time() - cache_file.stat().st_mtime < cache_ttl:
+            return cache_file.read_text(encoding='utf-8'), True
+    except OSError:
+        pass
+
+    content = fetch_page_content(url, playwright_ctx)
+    CACHE_DIR.mkdir(exist_ok=True)
+    cache_file.write_text(content, encoding='utf-8')
+    return content, False
+
+def extract_all_links(base_url, max_pages=50, use_playwright=False, playwright_ctx=None,
+                      cache_ttl=DEFAULT_CACHE_TTL):
     """Extract all documentation-related links from a website"""
 
-    visited = set()
-    to_visit = [base_url]
-    all_links = set()
+    if use_playwright and playwright_ctx is None and PLAYWRIGHT_AVAILABLE:
+        # Launch one browser for the whole crawl instead of one per page
+        with sync_playwright() as p:
+            browser = p.chromium.launch(headless=True)
+            try:
+                return extract_all_links(base_url, max_pages, use_playwright, browser.new_context(), cache_ttl)
+            finally:
+                browser.close()
+
+    parsed_base = _parse(base_url)
+    base_domain = parsed_base.netloc
+
+    # Same-domain links start with one of these, which is cheaper than re-parsing every href
+    base_prefixes = tuple(f'{scheme}://{base_domain}{sep}' for scheme in ('http', 'https') for sep in '/?#')
+    base_roots = {f'http://{base_domain}', f'https://{base_domain}'}
 
-    base_domain = urlparse(base_url).netloc
+    # Links are stored without the shared scheme://domain prefix to keep large crawls small
+    base_root = f'{parsed_base.scheme}://{base_domain}'
+    root_len = len(base_root)
+
+    base_suffix = _clean_url(base_url[root_len:] if base_url.startswith(base_root) else base_url)
+    to_visit = deque([base_url])
+    all_links = {base_suffix}
+
+    # Every link recorded or queued so far, ignoring trailing slashes
+    seen = {base_suffix.rstrip('/')}
 
     print(f"Extracting links from: {base_url}")
     print(f"Domain: {base_domain}")
@@ -66,53 +146,56 @@ def extract_all_links(base_url, max_pages=50, use_playwright=False):
     page_count = 0
 
     while to_visit and page_count < max_pages:
-        current_url = to_visit.pop(0)
-
-        if current_url in visited:
-            continue
-
-        visited.add(current_url)
+        current_url = to_visit.popleft()
         page_count += 1
 
         try:
             print(f"[{page_count}] Scanning: {current_url}")
 
             # Fetch page content
-            html_content = fetch_page_content(current_url, use_playwright)
-            soup = BeautifulSoup(html_content, 'html.parser')
+            html_content, from_cache = fetch_page_cached(current_url, playwright_ctx, cache_ttl)
+            tree = LexborHTMLParser(html_content)
 
             # Find all links on this page
-            for link in soup.find_all('a', href=True):
-                href = link['href']
+            for link in tree.css('a[href]'):
+                href = link.attributes['href'] or ''
 
                 # Convert relative URLs to absolute
                 if not href.startswith(('http://', 'https://')):
                     href = urljoin(current_url, href)
 
                 # Only keep links from the same domain
-                if urlparse(href).netloc == base_domain:
+                if href.startswith(base_prefixes) or href in base_roots:
                     # Clean up the URL (remove fragments, query params for cleaner list)
-                    clean_url = href.split('#')[0].split('?')[0]
-                    all_links.add(clean_url)
+                    clean_url = _clean_url(href)
+                    suffix = clean_url[root_len:] if clean_url.startswith(base_root) else clean_url
+
+                    # /doc/api and /doc/api/ are the same page, skip anything already seen
+                    key = suffix.rstrip('/')
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    all_links.add(suffix)
 
                     # Add to visit queue if it looks like documentation
-                    if (clean_url not in visited and
-                        clean_url not in to_visit and
-                        any(keyword in clean_url.lower() for keyword in ['doc', 'api', 'guide', 'tutorial'])):
+                    if _DOC_RE.search(clean_url.lower()):
                         to_visit.append(clean_url)
 
-            time.sleep(0.5 if not use_playwright else 1.0)  # Be more respectful with Playwright
+            if not from_cache:
+                time.sleep(0.5 if not use_playwright else 1.0)  # Be more respectful with Playwright
 
         except Exception as e:
             print(f"Error scanning {current_url}: {e}")
             continue
 
-    return sorted(all_links)
+    # Links on the other scheme were stored in full
+    return sorted(link if link.startswith(('http://', 'https://')) else base_root + link
+                  for link in all_links)
 
 def save_links(links, base_url, log_dir):
     """Save links to file and create fetch commands in timestamped log directory"""
 
-    domain = urlparse(base_url).netloc.replace('.', '_')
+    domain = _parse(base_url).netloc.replace('.', '_')
 
     # Save all links
     output_file = log_dir / "extracted_links.txt"
@@ -120,8 +203,8 @@ def save_links(links, base_url, log_dir):
         f.write(f"# All documentation links from {base_url}\n")
         f.write(f"# Total links found: {len(links)}\n\n")
 
-        for link in links:
-            f.write(link + '\n')
+        if links:
+            f.write('\n'.join(links) + '\n')
 
     # Create fetch command for all links
     fetch_file = log_dir / "fetch_commands.txt"
@@ -133,24 +216,28 @@ def save_links(links, base_url, log_dir):
         f.write(f"# Fetch commands for {base_url}\n")
         f.write(f"# Total commands: {len(chunks)}\n\n")
 
+        batches = []
         for i, chunk in enumerate(chunks, 1):
             cmd = f"python api_docs_fetcher.py {' '.join(chunk)} --output {domain}_docs/batch_{i:02d} --depth 3 --delay 1.0"
-            f.write(f"# Batch {i}\n")
-            f.write(cmd + '\n\n')
+            batches.append(f"# Batch {i}\n{cmd}\n\n")
+        f.write(''.join(batches))
 
     print(f"\nSaved {len(links)} links to: {output_file}")
     print(f"Saved fetch commands to: {fetch_file}")
 
     return fetch_file
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(description='Extract all documentation links from a website')
     parser.add_argument('url', help='Base URL to start extraction from')
     parser.add_argument('--max-pages', type=int, default=50, help='Maximum pages to scan (default: 50)')
     parser.add_argument('--use-playwright', action='store_true',
                        help='Use Playwright for JavaScript-rendered sites (slower but more complete)')
+    parser.add_argument('--cache-ttl', type=int, default=DEFAULT_CACHE_TTL,
+                       help=f'Reuse pages cached in {CACHE_DIR}/ younger than this many seconds (default: {DEFAULT_CACHE_TTL})')
+    parser.add_argument('--no-cache', action='store_true', help='Always fetch pages instead of using the cache')
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     # Check if Playwright is requested but not available
     if args.use_playwright and not PLAYWRIGHT_AVAILABLE:
@@ -159,13 +246,14 @@ def main():
         return
 
     # Create timestamped log directory
-    domain = urlparse(args.url).netloc.replace('.', '_').split('_')[0]  # Get main domain part
+    domain = _parse(args.url).netloc.replace('.', '_').split('_')[0]  # Get main domain part
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
     log_dir = Path("logs") / f"{domain}_{timestamp}"
     log_dir.mkdir(parents=True, exist_ok=True)
 
     # Extract all links
-    links = extract_all_links(args.url, args.max_pages, use_playwright=args.use_playwright)
+    links = extract_all_links(args.url, args.max_pages, use_playwright=args.use_playwright,
+                              cache_ttl=0 if args.no_cache else args.cache_ttl)
 
     # Save results
     save_links(links, args.url, log_dir)
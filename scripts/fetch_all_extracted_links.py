@@ -4,14 +4,18 @@ Fetch Documentation from All Extracted Links
 Processes each link from extracted_links.txt individually
 """
 
-import subprocess
-import time
-import sys
+import asyncio
+import aiohttp
 import argparse
+import hashlib
+import re
 from pathlib import Path
 from urllib.parse import urlparse
-from datetime import datetime
-import os
+
+from api_docs_fetcher import APIDocsFetcher, FetcherConfig, get_api_name
+
+# Anything outside these is replaced when turning a URL into a directory name
+_UNSAFE_CHARS_RE = re.compile(r'[^A-Za-z0-9_]+')
 
 def read_extracted_links(file_path="extracted_links.txt"):
     """Read all URLs from the extracted links file"""
@@ -33,8 +37,8 @@ def read_extracted_links(file_path="extracted_links.txt"):
         print(f"Error: {file_path} not found. Run extract_all_links.py first.")
         return []
 
-def run_doc_fetcher(url, output_base, delay=1.0, use_playwright=False):
-    """Run the doc fetcher on a single URL"""
+def get_output_dir(url, output_base):
+    """Build the output directory for a single URL"""
 
     # Create safe filename from URL - works with any domain
     parsed = urlparse(url)
@@ -44,9 +48,8 @@ def run_doc_fetcher(url, output_base, delay=1.0, use_playwright=False):
 
     # Clean up to make filesystem-safe
     url_part = url_part.strip('/')
-    url_part = url_part.replace('/', '_').replace('.html', '').replace('.htm', '')
-    url_part = url_part.replace('?', '_').replace('&', '_').replace('=', '_')
-    url_part = url_part.replace('-', '_').replace('.', '_')
+    url_part = url_part.replace('.html', '').replace('.htm', '')
+    url_part = _UNSAFE_CHARS_RE.sub('_', url_part)
 
     # Limit filename length
     if len(url_part) > 50:
@@ -54,51 +57,107 @@ def run_doc_fetcher(url, output_base, delay=1.0, use_playwright=False):
 
     # Ensure we have a valid name
     if not url_part or url_part == '_':
-        url_part = f"page_{hash(url) % 100000}"
+        # hash() is salted per process, sha1 keeps the name stable across runs
+        url_part = f"page_{hashlib.sha1(url.encode()).hexdigest()[:10]}"
+
+    return f"{output_base}/{url_part}"
+
+def save_page(url, soup, output_dir):
+    """Convert a single fetched page to markdown in-process with APIDocsFetcher"""
+
+    # A per-page converter keeps each folder's index limited to its own page
+    config = FetcherConfig(base_urls=[url], output_dir=output_dir)
+    converter = APIDocsFetcher(config)
+    try:
+        page_content = converter.extract_page_content(soup, url)
+        if not page_content:
+            return False, "No content extracted"
+
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+
+        converter.successful_pages.append(page_content)
+        file_path = converter.save_page(page_content, output_path, get_api_name(url), 0)
+
+        if config.create_index:
+            converter.create_index_file(output_path, {file_path.name: str(file_path)})
+    finally:
+        converter.close()
 
-    output_dir = f"{output_base}/{url_part}"
+    return True, None
 
-    # Get the scripts directory
-    script_dir = Path(__file__).parent
-    api_fetcher = script_dir / 'api_docs_fetcher.py'
+async def fetch_one(session, sem, fetcher, url, output_base, delay=1.0):
+    """Fetch a single URL and save it, holding one of the semaphore's slots"""
 
-    cmd = [
-        'python', str(api_fetcher),
-        url,
-        '--output', output_dir,
-        '--depth', '2',  # Keep depth low for individual processing
-        '--delay', str(delay)
-    ]
+    output_dir = get_output_dir(url, output_base)
 
-    # Add Playwright flag if enabled
-    if use_playwright:
-        cmd.append('--use-playwright')
+    async with sem:
+        try:
+            print(f"Processing: {url}")
+            print(f"Output: {output_dir}")
+
+            # Skips non-HTML and oversized responses from their headers, and renders with Playwright if enabled
+            soup = await fetcher.fetch_page_async(session, url)
+            if soup is None:
+                error = fetcher.fetch_errors.get(url, "Not an HTML page")
+                success = False
+            else:
+                # Extraction and writing are blocking, keep them off the event loop
+                success, error = await asyncio.to_thread(save_page, url, soup, output_dir)
+
+            # Small delay before this slot picks up the next link
+            await asyncio.sleep(delay)
+
+        except Exception as e:
+            print(f"  ERROR: {url} - {e}")
+            return url, False, str(e)
+
+    if success:
+        print(f"  SUCCESS: {url}")
+    else:
+        print(f"  FAILED: {url} - {error}")
+    return url, success, error
+
+async def fetch_all(links, output_base, delay=1.0, use_playwright=False, concurrency=10, cache_dir=None):
+    """Fetch all links concurrently over one shared aiohttp session"""
+
+    successful = []
+    failed = []
+
+    sem = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=20, keepalive_timeout=30)
+
+    # One fetcher (and so at most one browser) for the whole run; fetch_one's own sleep does the pacing
+    fetcher = APIDocsFetcher(FetcherConfig(
+        base_urls=links,
+        output_dir=output_base,
+        delay_seconds=0,
+        use_playwright=use_playwright,
+        cache_dir=cache_dir
+    ))
 
     try:
-        print(f"Processing: {url}")
-        print(f"Output: {output_dir}")
+        async with aiohttp.ClientSession(connector=connector, headers=fetcher.headers) as session:
+            tasks = [fetch_one(session, sem, fetcher, url, output_base, delay) for url in links]
 
-        result = subprocess.run(cmd,
-                              capture_output=True,
-                              text=True,
-                              timeout=120)  # 2 minute timeout per URL
+            for i, task in enumerate(asyncio.as_completed(tasks), 1):
+                url, success, error = await task
 
-        if result.returncode == 0:
-            print(f"  SUCCESS: {url}")
-            return True, None
-        else:
-            error_msg = result.stderr or result.stdout
-            print(f"  FAILED: {url} - {error_msg}")
-            return False, error_msg
-
-    except subprocess.TimeoutExpired:
-        print(f"  TIMEOUT: {url}")
-        return False, "Timeout"
-    except Exception as e:
-        print(f"  ERROR: {url} - {e}")
-        return False, str(e)
-
-def main():
+                if success:
+                    successful.append(url)
+                else:
+                    failed.append((url, error))
+
+                # Progress update every 10 links
+                if i % 10 == 0:
+                    print(f"\n--- Progress: {i}/{len(links)} completed ---")
+                    print(f"Successful: {len(successful)}, Failed: {len(failed)}")
+    finally:
+        await asyncio.to_thread(fetcher.close)
+
+    return successful, failed
+
+def main(argv=None):
     """Process all extracted links"""
 
     parser = argparse.ArgumentParser(description='Fetch all extracted documentation links')
@@ -107,7 +166,9 @@ def main():
     parser.add_argument('--delay', type=float, default=1.5, help='Delay between requests (seconds)')
     parser.add_argument('--use-playwright', action='store_true',
                        help='Use Playwright for JavaScript-rendered sites (slower but more complete)')
-    args = parser.parse_args()
+    parser.add_argument('--concurrency', type=int, default=10, help='Maximum links fetched at once (default: 10)')
+    parser.add_argument('--cache-dir', help='Cache fetched pages here and revalidate them on later runs')
+    args = parser.parse_args(argv)
 
     # Find the log directory
     if args.log_dir:
@@ -169,28 +230,12 @@ def main():
     print(f"Output directory: {output_base}/")
     print("=" * 60)
 
-    # Track progress
-    successful = []
-    failed = []
-
-    # Process each link
-    for i, url in enumerate(links, 1):
-        print(f"\n[{i}/{len(links)}] Processing: {url}")
-
-        success, error = run_doc_fetcher(url, output_base, delay=args.delay, use_playwright=args.use_playwright)
-
-        if success:
-            successful.append(url)
-        else:
-            failed.append((url, error))
-
-        # Progress update every 10 links
-        if i % 10 == 0:
-            print(f"\n--- Progress: {i}/{len(links)} completed ---")
-            print(f"Successful: {len(successful)}, Failed: {len(failed)}")
-
-        # Small delay between processing
-        time.sleep(0.5)
+    # Process links concurrently
+    successful, failed = asyncio.run(fetch_all(links, output_base,
+                                               delay=args.delay,
+                                               use_playwright=args.use_playwright,
+                                               concurrency=args.concurrency,
+                                               cache_dir=args.cache_dir))
 
     # Final summary
     print("\n" + "=" * 60)
@@ -213,15 +258,13 @@ def main():
         if successful:
             f.write("SUCCESSFUL LINKS:\n")
             f.write("-" * 20 + "\n")
-            for url in successful:
-                f.write(f"{url}\n")
+            f.write(''.join(f"{url}\n" for url in successful))
             f.write("\n")
 
         if failed:
             f.write("FAILED LINKS:\n")
             f.write("-" * 20 + "\n")
-            for url, error in failed:
-                f.write(f"{url} - {error}\n")
+            f.write(''.join(f"{url} - {error}\n" for url, error in failed))
 
     print(f"\nResults saved to {results_file}")
     print(f"Documentation saved to: {output_base}/")